@@ -0,0 +1,203 @@
+# Copyright Spack Project Developers. See COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Package-load and concretization benchmark for the cupecs repository.
+
+Run it with the interpreter of a local spack checkout that has this repository
+registered, e.g.:
+
+    spack python scripts/benchmark.py -o before.json
+    spack python scripts/benchmark.py -o after.json --compare before.json
+
+For every package under spack_repo/cupecs/packages it records the module import
+time and the number of directives of each kind, then concretizes a fixed matrix
+of specs and records the wall time. Results are written as JSON so they can be
+diffed between commits.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import spack
+import spack.config
+import spack.repo
+import spack.spec
+
+#: Specs concretized by default, chosen to cover every package in the repo.
+DEFAULT_SPECS = [
+    "cabana+serial",
+    "cabana+openmp+grid+mpi+hdf5",
+    "cabanafluids+hypre",
+    "cabanaghost",
+    "numesh",
+    "localityaware",
+    "mpipcl+examples",
+]
+
+#: Package class attributes holding directive results, keyed by condition.
+DIRECTIVES = [
+    "versions",
+    "variants",
+    "dependencies",
+    "conflicts",
+    "requirements",
+    "provided",
+    "patches",
+    "resources",
+]
+
+# spack python does not always set __file__ when running a script
+_SCRIPT = globals().get("__file__", sys.argv[0])
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(_SCRIPT)))
+
+
+def count_directives(pkg_cls):
+    counts = {}
+    for name in DIRECTIVES:
+        entries = getattr(pkg_cls, name, None) or {}
+        if name == "versions":
+            counts[name] = len(entries)
+            continue
+        counts[name] = sum(len(values) for values in entries.values())
+    counts["total"] = sum(counts.values())
+    return counts
+
+
+def load_packages(namespace):
+    repo = spack.repo.PATH.get_repo(namespace)
+
+    # Import the shared build systems first so they are not charged to the first package.
+    for module in ["cmake", "cuda", "rocm"]:
+        importlib.import_module("spack_repo.builtin.build_systems.{0}".format(module))
+
+    results = {}
+    for name in sorted(repo.all_package_names()):
+        pkg_cls = repo.get_pkg_class(name)
+        module = pkg_cls.__module__
+        sys.modules.pop(module, None)
+
+        start = time.perf_counter()
+        module_obj = importlib.import_module(module)
+        elapsed = time.perf_counter() - start
+
+        pkg_cls = getattr(module_obj, pkg_cls.__name__)
+        results[name] = {"import_time": elapsed, "directives": count_directives(pkg_cls)}
+    return results
+
+
+def concretize(abstract):
+    spec = spack.spec.Spec(abstract)
+    try:
+        import spack.concretize
+
+        return spack.concretize.concretize_one(spec)
+    except (ImportError, AttributeError):
+        return spec.concretized()
+
+
+def time_specs(specs, repeat):
+    results = {}
+    with spack.config.override("concretizer:reuse", False):
+        for abstract in specs:
+            times = []
+            nodes = 0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                concrete = concretize(abstract)
+                times.append(time.perf_counter() - start)
+                nodes = len(list(concrete.traverse()))
+            results[abstract] = {
+                "min": min(times),
+                "median": statistics.median(times),
+                "times": times,
+                "nodes": nodes,
+            }
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, threshold):
+    """Print time ratios against a baseline and return the specs that got slower."""
+    regressions = []
+    for abstract, result in current["concretize"].items():
+        previous = baseline.get("concretize", {}).get(abstract)
+        if not previous:
+            continue
+        ratio = result["min"] / previous["min"]
+        flag = ""
+        if ratio > threshold:
+            regressions.append(abstract)
+            flag = "  <-- regression"
+        print(
+            "{0:40} {1:8.2f}s {2:8.2f}s {3:6.2f}x{4}".format(
+                abstract, previous["min"], result["min"], ratio, flag
+            )
+        )
+
+    for name, result in current["packages"].items():
+        previous = baseline.get("packages", {}).get(name)
+        if previous and previous["directives"]["total"] != result["directives"]["total"]:
+            print(
+                "{0}: {1} -> {2} directives".format(
+                    name, previous["directives"]["total"], result["directives"]["total"]
+                )
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", default="benchmark.json", help="JSON file to write")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="concretizations per spec")
+    parser.add_argument("--namespace", default="cupecs", help="repository namespace to load")
+    parser.add_argument("--specs", nargs="+", default=DEFAULT_SPECS, help="specs to concretize")
+    parser.add_argument("--skip-concretize", action="store_true", help="only time package loads")
+    parser.add_argument("--compare", metavar="JSON", help="baseline results to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.5,
+        help="fail if a spec concretizes this many times slower than the baseline",
+    )
+    args = parser.parse_args(argv)
+
+    results = {
+        "spack": str(spack.spack_version),
+        "python": platform.python_version(),
+        "host": platform.node(),
+        "revision": git_revision(),
+        "packages": load_packages(args.namespace),
+        "concretize": {},
+    }
+    if not args.skip_concretize:
+        results["concretize"] = time_specs(args.specs, args.repeat)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# Copyright Spack Project Developers. See COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Populate and consume a local binary build cache for the cupecs environment stacks.
+
+The stacks live in environments/<name>/spack.yaml. On a machine that builds them:
+
+    scripts/buildcache.py push cpu-openmp /shared/spack-mirror
+
+installs the stack, pushes every installed spec to the filesystem mirror and stores
+the concretized stack (spack.lock) in the mirror, as environments/<name>/spack.lock. On
+a new node or in CI:
+
+    scripts/buildcache.py install cpu-openmp /shared/spack-mirror
+
+installs exactly the specs of that lockfile from binaries, without concretizing the
+stack again, only building what the cache does not have (use --cache-only to forbid
+building). The mirror and this repository are passed to spack through a temporary
+configuration scope, so neither the environment nor the user's configuration is
+modified.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENVIRONMENTS = os.path.join(REPO_ROOT, "environments")
+
+#: Name the local mirror is registered under in the temporary scope
+MIRROR_NAME = "cupecs-local"
+
+MIRRORS_YAML = """\
+mirrors:
+  {name}:
+    url: {url}
+    signed: false
+"""
+
+REPOS_YAML = """\
+repos:
+  cupecs: {path}
+"""
+
+#: The package repository the stacks register through $env, which a copy of an
+#: environment created elsewhere cannot resolve
+REPO_PATH = os.path.join(REPO_ROOT, "spack_pkgs", "spack_repo", "cupecs")
+
+
+def stacks():
+    return sorted(
+        name
+        for name in os.listdir(ENVIRONMENTS)
+        if os.path.isfile(os.path.join(ENVIRONMENTS, name, "spack.yaml"))
+    )
+
+
+def spack(args, *command, check=True, scope=None, env_dir=None):
+    """Run a spack command inside the environment in ``env_dir`` (by default the one of
+    the selected stack), with the configuration in the directory ``scope`` on top if
+    given. Pass ``env_dir=False`` to run it outside of any environment."""
+    if env_dir is None:
+        env_dir = os.path.join(ENVIRONMENTS, args.stack)
+    cmd = [args.spack]
+    if scope:
+        cmd += ["-C", scope]
+    if env_dir:
+        cmd += ["-D", env_dir]
+    cmd += list(command)
+    print("==> " + " ".join(cmd), flush=True)
+    subprocess.run(cmd, check=check)
+
+
+def mirror_url(path):
+    return "file://" + os.path.abspath(path)
+
+
+def lockfile(args):
+    """Where the concretized stack is stored in the mirror."""
+    return os.path.join(os.path.abspath(args.mirror), "environments", args.stack, "spack.lock")
+
+
+def push(args):
+    spack(args, "concretize", "--fresh")
+    spack(args, "install", "--jobs", str(args.jobs))
+    spack(args, "buildcache", "push", "--unsigned", "--update-index", mirror_url(args.mirror))
+
+    # Consumers install these exact specs, so that their hashes match the binaries
+    os.makedirs(os.path.dirname(lockfile(args)), exist_ok=True)
+    shutil.copyfile(os.path.join(ENVIRONMENTS, args.stack, "spack.lock"), lockfile(args))
+    print("==> Stored {0}".format(lockfile(args)), flush=True)
+
+
+def install(args):
+    if not os.path.isfile(lockfile(args)):
+        sys.exit("{0} not found; run 'push {1}' first".format(lockfile(args), args.stack))
+
+    # "spack mirror add" would write to the environment's spack.yaml, which is tracked in
+    # git, so pass the mirror through a throwaway configuration scope instead. The
+    # environment is created from the stored lockfile in a throwaway directory as well:
+    # concretizing again here could pick other hashes than the cached binaries.
+    with tempfile.TemporaryDirectory(prefix="cupecs-mirror-") as tmp:
+        scope = os.path.join(tmp, "config")
+        env_dir = os.path.join(tmp, args.stack)
+        os.mkdir(scope)
+        with open(os.path.join(scope, "mirrors.yaml"), "w") as f:
+            f.write(MIRRORS_YAML.format(name=MIRROR_NAME, url=mirror_url(args.mirror)))
+        with open(os.path.join(scope, "repos.yaml"), "w") as f:
+            f.write(REPOS_YAML.format(path=REPO_PATH))
+
+        spack(args, "env", "create", "-d", env_dir, lockfile(args), scope=scope, env_dir=False)
+        use = "only" if args.cache_only else "auto"
+        spack(
+            args,
+            "install",
+            "--use-buildcache",
+            use,
+            "--jobs",
+            str(args.jobs),
+            scope=scope,
+            env_dir=env_dir,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spack", default=shutil.which("spack") or "spack", help="spack to use")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="build jobs")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    push_parser = subparsers.add_parser("push", help="install a stack and push it to the mirror")
+    push_parser.set_defaults(func=push)
+
+    install_parser = subparsers.add_parser("install", help="install a stack from the mirror")
+    install_parser.add_argument(
+        "--cache-only", action="store_true", help="fail instead of building missing specs"
+    )
+    install_parser.set_defaults(func=install)
+
+    for subparser in (push_parser, install_parser):
+        subparser.add_argument("stack", choices=stacks(), help="environment stack")
+        subparser.add_argument("mirror", help="directory of the binary mirror")
+
+    args = parser.parse_args(argv)
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
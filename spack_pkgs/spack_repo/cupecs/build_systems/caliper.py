@@ -0,0 +1,35 @@
+# Copyright Spack Project Developers. See COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+from spack_repo.cupecs.build_systems.cmake_options import require_cmake_option
+
+from spack.package import *
+
+
+class CaliperPackage(PackageBase):
+    """Mixin for CMake applications with Caliper region annotations.
+
+    The ``caliper`` variant builds against Caliper with Adiak run metadata and enables the
+    annotations through the project's CMake option named by ``caliper_option``. Add
+    ``self.caliper_args()`` to ``cmake_args``. Every run then writes a ``.cali`` profile of
+    the annotated regions, aggregated across ranks.
+    """
+
+    #: CMake option of the project that enables its Caliper annotations
+    caliper_option = None
+
+    variant("caliper", default=False, description="Enable Caliper/Adiak region annotations")
+
+    depends_on("caliper +adiak +mpi", when="+caliper")
+    depends_on("adiak +mpi", when="+caliper")
+
+    def caliper_args(self):
+        """CMake arguments that turn the project's Caliper annotations on or off."""
+        return require_cmake_option(self, self.caliper_option, "caliper")
+
+    def setup_run_environment(self, env):
+        super().setup_run_environment(env)
+
+        if self.spec.satisfies("+caliper"):
+            env.set("CALI_CONFIG", "spot")
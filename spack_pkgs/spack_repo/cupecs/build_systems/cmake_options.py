@@ -0,0 +1,80 @@
+# Copyright Spack Project Developers. See COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import glob
+import json
+import os
+import re
+
+from spack.package import *
+
+
+def cmake_sources(source_dir):
+    """Yield the path of every CMakeLists.txt and ``*.cmake`` file under ``source_dir``."""
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            if name == "CMakeLists.txt" or name.endswith(".cmake"):
+                yield os.path.join(root, name)
+
+
+def has_cmake_option(source_dir, option):
+    """Whether any CMake file under ``source_dir`` refers to the variable ``option``."""
+    pattern = re.compile(r"\b{0}\b".format(re.escape(option)))
+    for path in cmake_sources(source_dir):
+        with open(path, errors="replace") as f:
+            if pattern.search(f.read()):
+                return True
+    return False
+
+
+def require_cmake_option(pkg, option, variant):
+    """Return the CMake arguments that set ``option`` from ``variant``.
+
+    Several of our packages build from moving branches; fail instead of silently setting an
+    option the checked-out sources no longer use when the variant is enabled.
+    """
+    if pkg.spec.satisfies("+" + variant) and not has_cmake_option(pkg.stage.source_path, option):
+        raise InstallError(
+            "{0} has no CMake option {1} for +{2}".format(pkg.name, option, variant),
+            long_msg="No CMake file under {0} refers to {1}".format(pkg.stage.source_path, option),
+        )
+    return [pkg.define_from_variant(option, variant)]
+
+
+def request_cmake_codemodel(build_directory):
+    """Ask CMake to write its code model into ``build_directory`` when it configures it."""
+    query = join_path(build_directory, ".cmake", "api", "v1", "query")
+    mkdirp(query)
+    touch(join_path(query, "codemodel-v2"))
+
+
+def cmake_executables(build_directory, source_subdir):
+    """Return the paths of the executables built by the targets that ``source_subdir`` (relative
+    to the top-level source directory) defines, from the code model requested with
+    :func:`request_cmake_codemodel`.
+    """
+    reply = join_path(build_directory, ".cmake", "api", "v1", "reply")
+    indices = sorted(glob.glob(join_path(reply, "index-*.json")))
+    if not indices:
+        raise InstallError("CMake did not write a code model to {0}".format(reply))
+    with open(indices[-1]) as f:
+        index = json.load(f)
+    codemodel = next(obj for obj in index["objects"] if obj["kind"] == "codemodel")
+    with open(join_path(reply, codemodel["jsonFile"])) as f:
+        model = json.load(f)
+
+    prefix = source_subdir.strip("/") + "/"
+    executables = []
+    for configuration in model["configurations"]:
+        for target in configuration["targets"]:
+            with open(join_path(reply, target["jsonFile"])) as f:
+                target = json.load(f)
+            if target["type"] != "EXECUTABLE":
+                continue
+            if not (target["paths"]["source"] + "/").startswith(prefix):
+                continue
+            for artifact in target.get("artifacts", []):
+                executables.append(os.path.join(build_directory, artifact["path"]))
+    return executables
@@ -0,0 +1,42 @@
+# Copyright Spack Project Developers. See COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+from spack.package import *
+
+
+class CompilerCachePackage(PackageBase):
+    """Mixin for CMake packages that are rebuilt often from moving branches.
+
+    The ``compiler_cache`` variant adds ccache or sccache as a build dependency and has
+    Spack's compiler wrapper run the real compiler through it, so a rebuild after a small
+    upstream change only recompiles the translation units that changed. The cache sees the
+    command line the wrapper builds, with the real compiler, target flags and dependency
+    include paths, so it cannot reuse objects built for another architecture or against
+    other dependencies. The wrapper only does this for C and C++; CUDA and HIP sources
+    compiled by nvcc/hipcc are not cached. It combines with the ``generator=ninja`` variant
+    every CMakePackage has.
+    """
+
+    variant(
+        "compiler_cache",
+        default="none",
+        values=("none", "ccache", "sccache"),
+        description="Compiler cache to run C/C++ compilations through",
+    )
+
+    depends_on("ccache", type="build", when="compiler_cache=ccache")
+    depends_on("sccache", type="build", when="compiler_cache=sccache")
+
+    def setup_build_environment(self, env):
+        super().setup_build_environment(env)
+
+        cache = self.spec.variants["compiler_cache"].value
+        if cache == "none":
+            return
+
+        # Spack's cc wrapper prepends this to the final C/C++ compiler command line
+        env.set("SPACK_CCACHE_BINARY", join_path(self.spec[cache].prefix.bin, cache))
+        if cache == "ccache":
+            # Hash paths inside the stage relative to it, so that rebuilds in a new stage hit
+            env.set("CCACHE_BASEDIR", self.stage.path)
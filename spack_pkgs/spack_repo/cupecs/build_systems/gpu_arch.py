@@ -0,0 +1,55 @@
+# Copyright Spack Project Developers. See COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+from spack_repo.builtin.build_systems.cuda import CudaPackage
+from spack_repo.builtin.build_systems.rocm import ROCmPackage
+from spack_repo.builtin.packages.kokkos.package import Kokkos
+
+from spack.package import *
+
+#: Device architectures our packages can be built for: everything here runs on Kokkos, so
+#: only the CUDA and AMD GPU architectures Kokkos knows about are usable.
+CUDA_ARCHS = [arch for arch in CudaPackage.cuda_arch_values if arch in Kokkos.spack_cuda_arch_map]
+AMDGPU_TARGETS = [arch for arch in ROCmPackage.amdgpu_targets if arch in Kokkos.amdgpu_arch_map]
+
+
+def require_supported_gpu_arch():
+    """Restrict ``cuda_arch``/``amdgpu_target`` of the package being defined to
+    :data:`CUDA_ARCHS`/:data:`AMDGPU_TARGETS`, so that every architecture it can be built for
+    is covered by :func:`propagate_gpu_arch`.
+    """
+    requires(
+        *["cuda_arch={0}".format(arch) for arch in CUDA_ARCHS],
+        policy="any_of",
+        when="+cuda",
+        msg="Kokkos cannot be built for this cuda_arch",
+    )
+    requires(
+        *["amdgpu_target={0}".format(arch) for arch in AMDGPU_TARGETS],
+        policy="any_of",
+        when="+rocm",
+        msg="Kokkos cannot be built for this amdgpu_target",
+    )
+
+
+def propagate_gpu_arch(dependency, when=None):
+    """Declare that ``dependency`` is built for the same device backend and architecture as
+    the package being defined. Call it from the body of a CudaPackage/ROCmPackage class
+    that also calls :func:`require_supported_gpu_arch`.
+
+    The solver cannot equate variants of two nodes, so this needs one directive per
+    supported ``cuda_arch``/``amdgpu_target`` value; ``cuda_arch`` and ``amdgpu_target`` are
+    only defined with ``+cuda``/``+rocm``, so each of them also implies the backend. Only use
+    it for dependencies whose device code is compiled for the architecture, and prefer
+    propagating through one such dependency (e.g. cabana) over repeating it for its own
+    dependencies.
+    """
+    condition = " {0}".format(when) if when else ""
+    for arch in CUDA_ARCHS:
+        cuda_dep = "+cuda cuda_arch={0}".format(arch)
+        depends_on("{0} {1}".format(dependency, cuda_dep), when=cuda_dep + condition)
+
+    for arch in AMDGPU_TARGETS:
+        rocm_dep = "+rocm amdgpu_target={0}".format(arch)
+        depends_on("{0} {1}".format(dependency, rocm_dep), when=rocm_dep + condition)
@@ -0,0 +1,92 @@
+# Copyright Spack Project Developers. See COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import functools
+import os
+
+from spack.package import *
+
+#: Cray MPICH GPU Transport Layer library needed for GPU-aware MPI with each backend
+GTL_LIBRARIES = {"rocm": "libmpi_gtl_hsa", "cuda": "libmpi_gtl_cuda"}
+
+
+@functools.lru_cache(maxsize=None)
+def find_cray_gtl(mpich_prefix, backend, mpich_rootdir=None):
+    """Return the directory containing the Cray MPICH GTL library for ``backend``.
+
+    Cray MPICH is installed as ``<rootdir>/ofi/<compiler>/<version>`` and keeps the GTL
+    libraries in ``<rootdir>/gtl/lib``. If the library cannot be found the link would still
+    succeed, but MPI would silently stage GPU buffers through the host, so this raises
+    instead of guessing.
+    """
+    libname = GTL_LIBRARIES[backend]
+    candidates = [join_path(mpich_prefix, "..", "..", "..", "gtl", "lib")]
+    if mpich_rootdir:
+        candidates.append(join_path(mpich_rootdir, "gtl", "lib"))
+    candidates.append(join_path(mpich_prefix, "lib"))
+
+    for candidate in candidates:
+        if os.path.isdir(candidate) and find_libraries(libname, root=candidate, recursive=False):
+            return os.path.realpath(candidate)
+
+    raise InstallError(
+        "Cannot find {0} for GPU-aware Cray MPICH".format(libname),
+        long_msg="Searched: {0}".format(", ".join(os.path.normpath(c) for c in candidates)),
+    )
+
+
+class GpuAwareMpiPackage(PackageBase):
+    """Mixin for CMake packages built with CudaPackage/ROCmPackage that need their MPI
+    to operate on device buffers. It links the GPU support of the MPI at build time and
+    enables it, along with Kokkos device and thread placement, in the run environment.
+    """
+
+    def gpu_aware_mpi_args(self):
+        """CMake arguments (and compiler setup) for building against a GPU-aware MPI."""
+        args = []
+
+        # Use hipcc as the c compiler if we are compiling for rocm. Doing it this way
+        # keeps the wrapper insted of changing CMAKE_CXX_COMPILER keeps the spack wrapper
+        # and the rpaths it sets for us from the underlying spec.
+        if self.spec.satisfies("+rocm"):
+            env["SPACK_CXX"] = self.spec["hip"].hipcc
+
+        # If we're building with cray mpich, we need to make sure we get the GTL library for
+        # gpu-aware MPI
+        for backend in GTL_LIBRARIES:
+            if self.spec.satisfies("+{0} ^cray-mpich".format(backend)):
+                gtl_dir = find_cray_gtl(
+                    str(self.spec["cray-mpich"].prefix),
+                    backend,
+                    os.environ.get("CRAY_MPICH_ROOTDIR"),
+                )
+                args.append(
+                    "-DCMAKE_EXE_LINKER_FLAGS=-Wl,-rpath={0} -L{0} -l{1}".format(
+                        gtl_dir, GTL_LIBRARIES[backend][len("lib") :]
+                    )
+                )
+                break
+        return args
+
+    def setup_run_environment(self, env):
+        super().setup_run_environment(env)
+
+        # Without these the MPI libraries either reject device pointers or stage them
+        # through host memory.
+        if self.spec.satisfies("+cuda") or self.spec.satisfies("+rocm"):
+            if self.spec.satisfies("^cray-mpich"):
+                env.set("MPICH_GPU_SUPPORT_ENABLED", "1")
+            if self.spec.satisfies("+cuda ^mvapich2"):
+                env.set("MV2_USE_CUDA", "1")
+            if self.spec.satisfies("+cuda ^openmpi"):
+                env.set("OMPI_MCA_opal_cuda_support", "true")
+
+            # Give each rank on a node its own device
+            if self.spec.satisfies("^kokkos"):
+                env.set("KOKKOS_MAP_DEVICE_ID_BY", "mpi_rank")
+
+        # Pin host threads so they are not migrated away from their data
+        if self.spec.satisfies("^kokkos+openmp"):
+            env.set("OMP_PROC_BIND", "spread")
+            env.set("OMP_PLACES", "threads")
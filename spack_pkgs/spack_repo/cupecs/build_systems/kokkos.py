@@ -0,0 +1,63 @@
+# Copyright Spack Project Developers. See COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+from spack.package import *
+
+
+class KokkosAppPackage(PackageBase):
+    """Mixin for packages whose kernels are compiled against Kokkos.
+
+    Kokkos derives its host architecture options (``Kokkos_ARCH_*``) from its own target
+    and exports the matching compiler flags to everything built against it, so the
+    kernels of a package are only tuned for the nodes it runs on if Kokkos was built for
+    the same target. Interprocedural optimization is available through the ``ipo``
+    variant every CMakePackage has.
+
+    The ``kokkos_tools`` variant pulls in a Kokkos Tools profiling library and loads it
+    through ``KOKKOS_TOOLS_LIBS`` in the run environment, so every run reports e.g. its
+    per-kernel timings without rebuilding.
+    """
+
+    #: Kokkos Tools library for each value of the kokkos_tools variant
+    kokkos_tools_libraries = {
+        "kernel-timer": "libkp_kernel_timer",
+        "memory-hwm": "libkp_hwm",
+        "space-time-stack": "libkp_space_time_stack",
+    }
+
+    variant(
+        "kokkos_tools",
+        default="none",
+        values=("none",) + tuple(kokkos_tools_libraries),
+        description="Kokkos Tools profiling library to load at run time",
+    )
+    for _tool in kokkos_tools_libraries:
+        depends_on("kokkos-tools", type="run", when="kokkos_tools={0}".format(_tool))
+
+    @run_before("cmake")
+    def check_kokkos_target(self):
+        # Old Cabana releases do not depend on Kokkos for every backend
+        if "kokkos" not in self.spec:
+            return
+        kokkos = self.spec["kokkos"]
+        if kokkos.target != self.spec.target:
+            tty.warn(
+                "{0} is built for target={1} but kokkos for target={2}; host kernels "
+                "will be tuned for {2}. Build kokkos with target={1} to avoid this.".format(
+                    self.name, self.spec.target, kokkos.target
+                )
+            )
+
+    def setup_run_environment(self, env):
+        super().setup_run_environment(env)
+
+        tool = self.spec.variants["kokkos_tools"].value
+        if tool == "none":
+            return
+        libname = self.kokkos_tools_libraries[tool]
+        libs = find_libraries(libname, root=self.spec["kokkos-tools"].prefix, recursive=True)
+        if libs:
+            env.set("KOKKOS_TOOLS_LIBS", libs[0])
+        else:
+            tty.warn("Cannot find {0} in kokkos-tools".format(libname))
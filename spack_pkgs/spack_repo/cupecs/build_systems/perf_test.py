@@ -0,0 +1,130 @@
+# Copyright Spack Project Developers. See COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import json
+import os
+import re
+import time
+
+from spack.package import *
+
+#: Matches "name: value [unit]" and "name = value [unit]" lines in benchmark output
+TIMING_LINE = re.compile(
+    r"^\s*(?P<name>[A-Za-z][\w .,()/-]*?)\s*[:=]\s*"
+    r"(?P<value>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*(?P<unit>[A-Za-z/%]*)\s*$"
+)
+
+
+def parse_timings(output):
+    """Collect every numeric ``name: value`` line of ``output``.
+
+    Returns a dict mapping each name to the list of values reported for it, in order, so
+    that per-step timings and iteration counts are kept as well as totals.
+    """
+    timings = {}
+    for line in output.splitlines():
+        match = TIMING_LINE.match(line)
+        if match:
+            timings.setdefault(match.group("name"), []).append(float(match.group("value")))
+    return timings
+
+
+#: A number as printed by C/C++ benchmarks
+NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+
+def parse_table(output):
+    """Collect the rows of the numeric tables in ``output``, e.g. one row per message size.
+
+    A row is a line of at least two comma- or whitespace-separated numbers. Its columns are
+    named after the closest preceding non-numeric line with as many fields (a header such as
+    ``bytes usec MBps``), or numbered if there is none. Returns a list of dicts.
+    """
+    rows = []
+    header = None
+    for line in output.splitlines():
+        fields = [field for field in re.split(r"[,\s]+", line.strip()) if field]
+        if len(fields) < 2:
+            continue
+        if not all(NUMBER.fullmatch(field) for field in fields):
+            header = fields
+            continue
+        if header and len(header) == len(fields):
+            names = header
+        else:
+            names = ["column{0}".format(i) for i in range(len(fields))]
+        rows.append(dict(zip(names, (float(field) for field in fields))))
+    return rows
+
+
+class PerfTestPackage(PackageBase):
+    """Mixin for packages whose standalone tests run a small benchmark and record how
+    long it took, so installs on the same machine can be compared.
+
+    Results are written as JSON to the test stage of the spec, next to the test log.
+    """
+
+    @property
+    def benchmark_dir(self):
+        """Directory for benchmarks the project builds but does not install itself."""
+        return join_path(self.prefix.libexec, self.name)
+
+    def install_benchmarks(self, pattern, root=None):
+        """Install the executables under ``root`` (by default the build directory) whose
+        names match ``pattern`` into :attr:`benchmark_dir`.
+        """
+        mkdirp(self.benchmark_dir)
+        for path in find(root or self.build_directory, pattern, recursive=True):
+            if os.path.isfile(path) and os.access(path, os.X_OK):
+                install(path, self.benchmark_dir)
+
+    def executables_in(self, directory):
+        """Return the executable files directly inside ``directory``."""
+        if not os.path.isdir(directory):
+            return []
+        paths = (join_path(directory, name) for name in sorted(os.listdir(directory)))
+        return [p for p in paths if os.path.isfile(p) and os.access(p, os.X_OK)]
+
+    def mpi_launcher(self):
+        """Return the launcher of the MPI this package was built with."""
+        mpi_bin = self.spec["mpi"].prefix.bin
+        launcher = which("mpiexec", "mpirun", path=mpi_bin) or which("mpiexec", "mpirun")
+        if launcher is None:
+            raise SkipTest("No mpiexec or mpirun found for {0}".format(self.spec["mpi"].name))
+        if self.spec.satisfies("^openmpi"):
+            launcher.add_default_arg("--oversubscribe")
+        return launcher
+
+    def run_benchmark(self, exe, args=(), ranks=None):
+        """Run ``exe`` with ``args``, on ``ranks`` MPI processes if given, and return
+        its wall time, output and the timings parsed from it.
+        """
+        command = [exe] + list(args)
+        start = time.perf_counter()
+        if ranks:
+            output = self.mpi_launcher()("-n", str(ranks), *command, output=str, error=str)
+        else:
+            output = Executable(exe)(*args, output=str, error=str)
+        wall_time = time.perf_counter() - start
+
+        return {
+            "command": command,
+            "ranks": ranks,
+            "wall_time": wall_time,
+            "timings": parse_timings(output),
+            "output": output,
+        }
+
+    def write_benchmark_results(self, name, results):
+        """Write ``results`` to ``<name>.json`` in the test stage and return its path."""
+        path = join_path(self.test_suite.test_dir_for_spec(self.spec), name + ".json")
+        record = {
+            "spec": self.spec.format("{name}{@version}{variants}"),
+            "hash": self.spec.dag_hash(),
+            "results": results,
+        }
+        with open(path, "w") as f:
+            json.dump(record, f, indent=2)
+        print("Benchmark results written to {0}".format(path))
+        return path
@@ -2,15 +2,24 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import os
+
 from spack_repo.builtin.build_systems.cmake import CMakePackage
 from spack_repo.builtin.build_systems.cuda import CudaPackage
 from spack_repo.builtin.build_systems.rocm import ROCmPackage
 from spack_repo.builtin.packages.kokkos.package import Kokkos
+from spack_repo.cupecs.build_systems.compiler_cache import CompilerCachePackage
+from spack_repo.cupecs.build_systems.gpu_arch import (
+    propagate_gpu_arch,
+    require_supported_gpu_arch,
+)
+from spack_repo.cupecs.build_systems.kokkos import KokkosAppPackage
+from spack_repo.cupecs.build_systems.perf_test import PerfTestPackage
 
 from spack.package import *
 
 
-class Cabana(CMakePackage, CudaPackage, ROCmPackage):
+class Cabana(CMakePackage, CudaPackage, ROCmPackage, KokkosAppPackage, PerfTestPackage, CompilerCachePackage):
     """CUP-ECS Fork of Exascale Co-Design Center for Particle Applications Toolkit"""
 
     homepage = "https://github.com/CUP-ECS/Cabana"
@@ -50,38 +59,53 @@ class Cabana(CMakePackage, CudaPackage, ROCmPackage):
     variant("testing", default=False, description="Build unit tests")
     variant("examples", default=False, description="Build tutorial examples")
     variant("performance_testing", default=False, description="Build performance tests")
+    variant(
+        "unity_build",
+        default=False,
+        description="Compile tests, examples and performance tests as unity builds",
+    )
+    variant(
+        "fft",
+        default="auto",
+        values=("auto", "fftw", "mkl"),
+        when="+heffte",
+        description="Host FFT library for heFFTe (auto: FFTW, none on device builds)",
+    )
 
     depends_on("c", type="build", when="+mpi")
     depends_on("cxx", type="build")
 
     depends_on("cmake@3.9:", type="build", when="@:0.4.0")
     depends_on("cmake@3.16:", type="build", when="@0.5.0:")
+    depends_on("cmake@3.16:", type="build", when="+unity_build")
 
     depends_on("googletest", type="build", when="+testing")
+
+    # Kokkos version and backend constraints are independent of each other, so they are
+    # declared separately instead of once per version/backend pair.
     _versions = {"0.3:": "@3.1:", "0.4:": "@3.2:", "0.6:": "@3.7:"}
     for _version in _versions:
-        _kk_version = _versions[_version]
-        for _backend in _kokkos_backends:
-            if _backend == "cuda" or _backend == "hip":
-                continue
-            else:
-                _kk_spec = "kokkos{0}+{1}".format(_kk_version, _backend)
-            depends_on(_kk_spec, when="@{0}+{1}".format(_version, _backend))
-
-    # Propagate cuda architectures down to Kokkos and optional submodules
-    for arch in CudaPackage.cuda_arch_values:
-        cuda_dep = "+cuda cuda_arch={0}".format(arch)
-        depends_on("kokkos {0}".format(cuda_dep), when=cuda_dep)
-        depends_on("heffte {0}".format(cuda_dep), when="+heffte {0}".format(cuda_dep))
-        depends_on("arborx {0}".format(cuda_dep), when="+arborx {0}".format(cuda_dep))
-        depends_on("hypre {0}".format(cuda_dep), when="+hypre {0}".format(cuda_dep))
-
-    for arch in ROCmPackage.amdgpu_targets:
-        rocm_dep = "+rocm amdgpu_target={0}".format(arch)
-        depends_on("kokkos {0}".format(rocm_dep), when=rocm_dep)
-        depends_on("heffte {0}".format(rocm_dep), when="+heffte {0}".format(rocm_dep))
-        depends_on("arborx {0}".format(rocm_dep), when="+arborx {0}".format(rocm_dep))
-        depends_on("hypre {0}".format(rocm_dep), when="+hypre {0}".format(rocm_dep))
+        depends_on("kokkos{0}".format(_versions[_version]), when="@{0}".format(_version))
+    for _backend in _kokkos_backends:
+        if _backend == "cuda" or _backend == "hip":
+            continue
+        depends_on("kokkos+{0}".format(_backend), when="@0.3:+{0}".format(_backend))
+
+    # Build Kokkos and the optional submodules for the same devices as Cabana. Cabana 0.7
+    # and older link hypre_cmake, so only constrain hypre where Cabana actually uses it.
+    require_supported_gpu_arch()
+    propagate_gpu_arch("kokkos")
+    propagate_gpu_arch("heffte", when="+heffte")
+    propagate_gpu_arch("arborx", when="+arborx")
+    propagate_gpu_arch("hypre", when="@0.8.0: +hypre")
+
+    # Propagate the host backends as well, so that e.g. +openmp +arborx does not end up
+    # with a serial-only ArborX. ArborX has no threads backend and hypre only offers
+    # OpenMP; heFFTe has no host backend of its own.
+    for _backend in ["serial", "openmp"]:
+        depends_on("arborx +{0}".format(_backend), when="+arborx +{0}".format(_backend))
+    depends_on("hypre_cmake +openmp", when="@0.4.0:0.7.0 +hypre +openmp")
+    depends_on("hypre +openmp", when="@0.8.0: +hypre +openmp")
 
     conflicts("+cuda", when="cuda_arch=none")
     conflicts("+rocm", when="amdgpu_target=none")
@@ -99,6 +123,13 @@ class Cabana(CMakePackage, CudaPackage, ROCmPackage):
     depends_on("heffte@2.0.0", when="@0.4.0+heffte")
     depends_on("heffte@2.1.0", when="@0.5.0+heffte")
     depends_on("heffte@2.3.0:", when="@0.6.0:+heffte")
+
+    # Host FFT backend of heFFTe. Device builds always use cuFFT/rocFFT (see
+    # propagate_gpu_arch above); there fftw and mkl add a host FFT next to it.
+    with when("+heffte"):
+        depends_on("heffte +fftw", when="fft=fftw")
+        depends_on("heffte +mkl", when="fft=mkl")
+        depends_on("heffte +fftw", when="fft=auto ~cuda ~rocm")
     depends_on("silo", when="@0.5.0:+silo")
     depends_on("hdf5", when="@0.6.0:+hdf5")
     depends_on("mpi", when="+mpi")
@@ -122,10 +153,26 @@ class Cabana(CMakePackage, CudaPackage, ROCmPackage):
     conflicts("+silo", when="@:0.3.0")
     conflicts("+hdf5", when="@:0.5.0")
 
-    @when("+mpi")
+    # Source directories of the tests, examples and performance tests (Cajita/Grid included)
+    _unity_build_dirs = ["unit_test", "example", "benchmark"]
+
     def patch(self):
         # CMakeLists.txt tries to enable C when MPI is requsted, but too late:
-        filter_file("LANGUAGES CXX", "LANGUAGES C CXX", "CMakeLists.txt")
+        if self.spec.satisfies("+mpi"):
+            filter_file("LANGUAGES CXX", "LANGUAGES C CXX", "CMakeLists.txt")
+
+        # Only unity-build the targets of the test, example and benchmark directories; the
+        # installed libraries are built as usual.
+        if self.spec.satisfies("+unity_build"):
+            for path in find(".", "CMakeLists.txt", recursive=True):
+                parts = os.path.normpath(os.path.dirname(path)).split(os.sep)
+                matches = [i for i, part in enumerate(parts) if part in self._unity_build_dirs]
+                # Subdirectories inherit the variable from the top-most matching directory
+                if matches and matches[0] == len(parts) - 1:
+                    with open(path) as f:
+                        contents = f.read()
+                    with open(path, "w") as f:
+                        f.write("set(CMAKE_UNITY_BUILD ON)\n" + contents)
 
     def cmake_args(self):
         options = [self.define_from_variant("BUILD_SHARED_LIBS", "shared")]
@@ -162,3 +209,32 @@ class Cabana(CMakePackage, CudaPackage, ROCmPackage):
             options.append(self.define("CMAKE_CXX_COMPILER", self.spec["hip"].hipcc))
 
         return options
+
+    @run_after("install", when="+performance_testing")
+    def install_performance_tests(self):
+        # Cabana does not install its performance tests; keep them for the standalone test
+        self.install_benchmarks("*Performance")
+
+    def test_performance(self):
+        """run the performance tests at their small size and record the results"""
+        exes = self.executables_in(self.benchmark_dir)
+        if not exes:
+            raise SkipTest("Cabana was built without +performance_testing")
+
+        test_dir = self.test_suite.test_dir_for_spec(self.spec)
+        results = {}
+        for exe in exes:
+            name = os.path.basename(exe)
+            report = join_path(test_dir, name + ".txt")
+
+            # Communication benchmarks need more than one rank to exchange anything
+            ranks = None
+            if self.spec.satisfies("+mpi"):
+                ranks = 2 if "Comm" in name or "Halo" in name else 1
+
+            result = self.run_benchmark(exe, [report, "small"], ranks=ranks)
+            if os.path.exists(report):
+                with open(report) as f:
+                    result["report"] = f.read()
+            results[name] = result
+        self.write_benchmark_results("cabana-performance", results)
@@ -3,14 +3,26 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import json
+import os
+
 from spack_repo.builtin.build_systems.cmake import CMakePackage
 from spack_repo.builtin.build_systems.cuda import CudaPackage
 from spack_repo.builtin.build_systems.rocm import ROCmPackage
 from spack_repo.builtin.packages.kokkos.package import Kokkos
+from spack_repo.cupecs.build_systems.caliper import CaliperPackage
+from spack_repo.cupecs.build_systems.compiler_cache import CompilerCachePackage
+from spack_repo.cupecs.build_systems.gpu_arch import (
+    propagate_gpu_arch,
+    require_supported_gpu_arch,
+)
+from spack_repo.cupecs.build_systems.gpu_mpi import GpuAwareMpiPackage
+from spack_repo.cupecs.build_systems.kokkos import KokkosAppPackage
+from spack_repo.cupecs.build_systems.perf_test import PerfTestPackage
 
 from spack.package import *
 
-class Cabanafluids(CMakePackage, CudaPackage, ROCmPackage):
+class Cabanafluids(CMakePackage, CudaPackage, ROCmPackage, GpuAwareMpiPackage, KokkosAppPackage, PerfTestPackage, CaliperPackage, CompilerCachePackage):
     """Fluid advection benchmark for exploring stream-triggered halo exchanges and sparse matrix methods in the Cabana/Cajita performance portability framework."""
 
     homepage = "https://github.com/CUP-ECS/CabanaFluids"
@@ -25,10 +37,9 @@ class Cabanafluids(CMakePackage, CudaPackage, ROCmPackage):
 
     # Variants are primarily backends to build on GPU systems and pass the right
     # informtion to the packages we depend on
-    variant("cuda", default=False, description="Use CUDA support from subpackages")
-    variant("rocm", default=False, description="Use ROCM support from subpackages")
     variant("openmp", default=False, description="Use OpenMP support from subpackages")
     variant("hypre", default=False, description="Include support for hypre structured solver in addition to the included reference solver.")
+    variant("testing", default=False, description="Build and install the googletest suite for spack test")
 
     # Dependencies for all CabanaFluids versions
     depends_on("c", type="build")
@@ -41,6 +52,27 @@ class Cabanafluids(CMakePackage, CudaPackage, ROCmPackage):
     # Cabana dependencies
     depends_on("cabana @0.7.0: +grid +silo +mpi") # Base cabana features we need
     depends_on("cabana +hypre", when="+hypre") # If we want hypre
+    depends_on("cabana +openmp", when="+openmp")
+
+    # Build Cabana, and through it Kokkos, for the same devices as the application
+    require_supported_gpu_arch()
+    propagate_gpu_arch("cabana")
+
+    conflicts("+cuda", when="cuda_arch=none")
+    conflicts("+rocm", when="amdgpu_target=none")
+
+    # Keep the hypre solver on the device with the rest of the application instead of
+    # copying fields to the host on every solve. Cabana 0.7 and older link a host-only
+    # hypre_cmake, so device builds need Cabana 0.8 (its master branch for now), which
+    # builds hypre for its own device architecture.
+    conflicts(
+        "^cabana@:0.7", when="+hypre +cuda", msg="A device hypre needs cabana@0.8.0: (master)"
+    )
+    conflicts(
+        "^cabana@:0.7", when="+hypre +rocm", msg="A device hypre needs cabana@0.8.0: (master)"
+    )
+    depends_on("hypre +unified-memory +gpu-aware-mpi", when="+hypre +cuda")
+    depends_on("hypre +unified-memory +gpu-aware-mpi", when="+hypre +rocm")
 
     # Make sure we have the serial backend if we don't have cuda or rocm
     depends_on("cabana +serial", when="~cuda~rocm")
@@ -59,26 +91,51 @@ class Cabanafluids(CMakePackage, CudaPackage, ROCmPackage):
     conflicts("openmpi ~cuda", when="+cuda")
     conflicts("^spectrum-mpi", when="^cuda@11.3:")  # cuda-aware spectrum is broken with cuda 11.3:
 
+    caliper_option = "CabanaFluids_ENABLE_CALIPER"
+
     # CMake specific build functions
     def cmake_args(self):
-        args = []
-
-        # Use hipcc as the c compiler if we are compiling for rocm. Doing it this way
-        # keeps the wrapper insted of changing CMAKE_CXX_COMPILER keeps the spack wrapper
-        # and the rpaths it sets for us from the underlying spec.
-        if "+rocm" in self.spec:
-            env["SPACK_CXX"] = self.spec["hip"].hipcc
-
-        # If we're building with cray mpich, we need to make sure we get the GTL library for
-        # gpu-aware MPI, since cabana requires it
-        if self.spec.satisfies("+rocm ^cray-mpich"):
-            gtl_dir = join_path(self.spec["cray-mpich"].prefix, "..", "..", "..", "gtl", "lib")
-            args.append(
-                "-DCMAKE_EXE_LINKER_FLAGS=-Wl,-rpath={0} -L{0} -lmpi_gtl_hsa".format(gtl_dir)
-            )
-        elif self.spec.satisfies("+cuda ^cray-mpich"):
-            gtl_dir = join_path(self.spec["cray-mpich"].prefix, "..", "..", "..", "gtl", "lib")
-            args.append(
-                "-DCMAKE_EXE_LINKER_FLAGS=-Wl,-rpath={0} -L{0} -lmpi_gtl_cuda".format(gtl_dir)
-            )
+        args = [self.define_from_variant("BUILD_TESTING", "testing")]
+        args.extend(self.caliper_args())
+        args.extend(self.gpu_aware_mpi_args())
         return args
+
+    @run_after("install", when="+testing")
+    def install_unit_tests(self):
+        # CabanaFluids does not install its googletest suite. Keep the test executables
+        # and the exact commands CTest runs them with (launcher, ranks, arguments).
+        ctest = Executable(join_path(self.spec["cmake"].prefix.bin, "ctest"))
+        with working_dir(self.build_directory):
+            listing = json.loads(ctest("--show-only=json-v1", output=str))
+
+        mkdirp(self.benchmark_dir)
+        tests = []
+        for test in listing.get("tests", []):
+            command = []
+            for arg in test.get("command", []):
+                if arg.startswith(self.build_directory) and os.path.isfile(arg):
+                    install(arg, self.benchmark_dir)
+                    arg = join_path(self.benchmark_dir, os.path.basename(arg))
+                command.append(arg)
+            if command:
+                tests.append({"name": test["name"], "command": command})
+
+        with open(join_path(self.benchmark_dir, "tests.json"), "w") as f:
+            json.dump(tests, f, indent=2)
+
+    def test_unit_tests(self):
+        """run the googletest suite and record the wall time of each test"""
+        manifest = join_path(self.benchmark_dir, "tests.json")
+        if not os.path.exists(manifest):
+            raise SkipTest("The CabanaFluids unit tests are only installed with +testing")
+        with open(manifest) as f:
+            tests = json.load(f)
+        if not tests:
+            raise SkipTest("CabanaFluids registers no tests with CTest")
+
+        # A failing test exits non-zero, which fails this one
+        results = {}
+        for test in tests:
+            command = test["command"]
+            results[test["name"]] = self.run_benchmark(command[0], command[1:])
+        self.write_benchmark_results("cabanafluids-unit-tests", results)
@@ -3,14 +3,26 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import os
+import re
+
 from spack_repo.builtin.build_systems.cmake import CMakePackage
 from spack_repo.builtin.build_systems.cuda import CudaPackage
 from spack_repo.builtin.build_systems.rocm import ROCmPackage
 from spack_repo.builtin.packages.kokkos.package import Kokkos
+from spack_repo.cupecs.build_systems.cmake_options import require_cmake_option
+from spack_repo.cupecs.build_systems.compiler_cache import CompilerCachePackage
+from spack_repo.cupecs.build_systems.gpu_arch import (
+    propagate_gpu_arch,
+    require_supported_gpu_arch,
+)
+from spack_repo.cupecs.build_systems.gpu_mpi import GpuAwareMpiPackage
+from spack_repo.cupecs.build_systems.kokkos import KokkosAppPackage
+from spack_repo.cupecs.build_systems.perf_test import PerfTestPackage
 
 from spack.package import *
 
-class Cabanaghost(CMakePackage, CudaPackage, ROCmPackage):
+class Cabanaghost(CMakePackage, CudaPackage, ROCmPackage, GpuAwareMpiPackage, KokkosAppPackage, PerfTestPackage, CompilerCachePackage):
     """Halo Exchange Benchmark for Exploring Fine-grain Communication APIs and Performance in the Cabana/Cajita performance portability framework."""
 
 
@@ -24,6 +36,18 @@ class Cabanaghost(CMakePackage, CudaPackage, ROCmPackage):
     version("develop", branch="develop")
     version("main", branch="main")
 
+    # Communication libraries to compare against the standard halo exchange
+    variant(
+        "localityaware",
+        default=False,
+        description="Build halo exchanges using locality-aware neighborhood collectives",
+    )
+    variant(
+        "mpipcl",
+        default=False,
+        description="Build halo exchanges using MPI 4 partitioned communication from MPIPCL",
+    )
+
     # Dependencies for all CabanaGhost versions - we need cuda-aware MPI
     depends_on("c", type="build")
     depends_on("cxx", type="build")
@@ -35,6 +59,18 @@ class Cabanaghost(CMakePackage, CudaPackage, ROCmPackage):
     # Cabana dependencies
     depends_on("cabana @0.7.0: +serial +threads +grid +silo +mpi")
 
+    # Build Cabana, and through it Kokkos, for the same devices as the application
+    require_supported_gpu_arch()
+    propagate_gpu_arch("cabana")
+
+    conflicts("+cuda", when="cuda_arch=none")
+    conflicts("+rocm", when="amdgpu_target=none")
+
+    # Alternative communication libraries, built for the same devices as the application
+    depends_on("localityaware", when="+localityaware")
+    propagate_gpu_arch("localityaware", when="+localityaware")
+    depends_on("mpipcl ~unique_names", when="+mpipcl")
+
     # Silo dependencies
     depends_on("silo @4.11:")
     depends_on("silo @4.11.1:", when="%cce")  # Eariler silo versions have trouble cce
@@ -45,26 +81,45 @@ class Cabanaghost(CMakePackage, CudaPackage, ROCmPackage):
     conflicts("openmpi ~cuda", when="+cuda")
     conflicts("^spectrum-mpi", when="^cuda@11.3:")  # cuda-aware spectrum is broken with cuda 11.3:
 
+    # Standalone test: a small halo exchange (32^3 cells, 10 steps) on a few local ranks.
+    # Only executables whose usage text lists all of these flags are run with them.
+    halo_test_ranks = [2, 4]
+    halo_test_args = ["-n", "32", "-t", "10"]
+
     # CMake specific build functions
     def cmake_args(self):
-        args = []
-
-        # Use hipcc as the c compiler if we are compiling for rocm. Doing it this way
-        # keeps the wrapper insted of changing CMAKE_CXX_COMPILER keeps the spack wrapper
-        # and the rpaths it sets for us from the underlying spec.
-        if "+rocm" in self.spec:
-            env["SPACK_CXX"] = self.spec["hip"].hipcc
-
-        # If we're building with cray mpich, we need to make sure we get the GTL library for
-        # gpu-aware MPI, since cabana requires it
-        if self.spec.satisfies("+rocm ^cray-mpich"):
-            gtl_dir = join_path(self.spec["cray-mpich"].prefix, "..", "..", "..", "gtl", "lib")
-            args.append(
-                "-DCMAKE_EXE_LINKER_FLAGS=-Wl,-rpath={0} -L{0} -lmpi_gtl_hsa".format(gtl_dir)
-            )
-        elif self.spec.satisfies("+cuda ^cray-mpich"):
-            gtl_dir = join_path(self.spec["cray-mpich"].prefix, "..", "..", "..", "gtl", "lib")
-            args.append(
-                "-DCMAKE_EXE_LINKER_FLAGS=-Wl,-rpath={0} -L{0} -lmpi_gtl_cuda".format(gtl_dir)
-            )
+        args = require_cmake_option(self, "CabanaGhost_ENABLE_LOCALITY_AWARE", "localityaware")
+        args.extend(require_cmake_option(self, "CabanaGhost_ENABLE_MPIPCL", "mpipcl"))
+        args.extend(self.gpu_aware_mpi_args())
         return args
+
+    def test_halo_exchange(self):
+        """run a small halo exchange on the host and record its timings"""
+        if self.spec.satisfies("+cuda") or self.spec.satisfies("+rocm"):
+            raise SkipTest("The halo exchange test needs a host-only build")
+
+        exes = self.executables_in(self.prefix.bin)
+        if not exes:
+            raise SkipTest("No CabanaGhost executables are installed")
+
+        results = {}
+        for exe in exes:
+            if not self._takes_halo_test_args(exe):
+                print("Skipping {0}: its usage does not list {1}".format(exe, self.halo_test_args))
+                continue
+            for ranks in self.halo_test_ranks:
+                label = "{0}-np{1}".format(os.path.basename(exe), ranks)
+                results[label] = self.run_benchmark(exe, self.halo_test_args, ranks=ranks)
+        if not results:
+            raise SkipTest("No CabanaGhost executable takes the halo test arguments")
+        self.write_benchmark_results("cabanaghost-halo", results)
+
+    def _takes_halo_test_args(self, exe):
+        """Whether the usage text ``exe`` prints for ``--help`` lists every flag of
+        ``halo_test_args``.
+        """
+        usage = self.mpi_launcher()(
+            "-n", "1", exe, "--help", output=str, error=str, fail_on_error=False
+        )
+        flags = [arg for arg in self.halo_test_args if arg.startswith("-")]
+        return all(re.search(r"(^|[\s\[,])" + re.escape(flag) + r"\b", usage) for flag in flags)
@@ -19,13 +19,23 @@
 # See the Spack documentation for more information on packaging.
 # ----------------------------------------------------------------------------
 
+import os
+
 from spack_repo.builtin.build_systems.cmake import CMakePackage
 from spack_repo.builtin.build_systems.cuda import CudaPackage
 from spack_repo.builtin.build_systems.rocm import ROCmPackage
+from spack_repo.cupecs.build_systems.cmake_options import (
+    cmake_executables,
+    request_cmake_codemodel,
+    require_cmake_option,
+)
+from spack_repo.cupecs.build_systems.compiler_cache import CompilerCachePackage
+from spack_repo.cupecs.build_systems.gpu_mpi import GpuAwareMpiPackage
+from spack_repo.cupecs.build_systems.perf_test import PerfTestPackage, parse_table
 
 from spack.package import *
 
-class Localityaware(CMakePackage, CudaPackage, ROCmPackage):
+class Localityaware(CMakePackage, CudaPackage, ROCmPackage, GpuAwareMpiPackage, PerfTestPackage, CompilerCachePackage):
     """Locality-aware optimizations for standard MPI collectives as well as neighborhood collectives."""
 
     homepage = "https://github.com/mpi-advance"
@@ -49,6 +59,11 @@ class Localityaware(CMakePackage, CudaPackage, ROCmPackage):
     # informtion to the packages we depend on
     # variant("cuda", default=False, description="Use CUDA support from subpackages")
     # variant("openmp", default=False, description="Use OpenMP support from subpackages")
+    variant(
+        "benchmarks",
+        default=False,
+        description="Build the collective and neighborhood collective benchmarks",
+    )
 
     # MPI dependencies
     depends_on("mpi")
@@ -74,26 +89,40 @@ class Localityaware(CMakePackage, CudaPackage, ROCmPackage):
     # conflicts("^spectrum-mpi", when="^cuda@11.3:") # cuda-aware spectrum is broken with cuda 11.3:
 
 
+    # Standalone test: ranks to compare the collectives on within a single node
+    collective_test_ranks = 4
+
     # CMake specific build functions
     def cmake_args(self):
-        args = []
-
-        # Use hipcc as the c compiler if we are compiling for rocm. Doing it this way
-        # keeps the wrapper insted of changeing CMAKE_CXX_COMPILER keeps the spack wrapper
-        # and the rpaths it sets for us from the underlying spec.
-        if self.spec.satisfies("+rocm"):
-            env["SPACK_CXX"] = self.spec["hip"].hipcc
-
-        # If we're building with cray mpich, we need to make sure we get the GTL library for
-        # gpu-aware MPI
-        if self.spec.satisfies("+rocm ^cray-mpich"):
-            gtl_dir = join_path(self.spec["cray-mpich"].prefix, "..", "..", "..", "gtl", "lib")
-            args.append(
-                "-DCMAKE_EXE_LINKER_FLAGS=-Wl,-rpath={0} -L{0} -lmpi_gtl_hsa".format(gtl_dir)
-            )
-        elif self.spec.satisfies("+cuda ^cray-mpich"):
-            gtl_dir = join_path(self.spec["cray-mpich"].prefix, "..", "..", "..", "gtl", "lib")
-            args.append(
-                "-DCMAKE_EXE_LINKER_FLAGS=-Wl,-rpath={0} -L{0} -lmpi_gtl_cuda".format(gtl_dir)
-            )
+        args = require_cmake_option(self, "ENABLE_BENCHMARKS", "benchmarks")
+        args.extend(self.gpu_aware_mpi_args())
         return args
+
+    @run_before("cmake", when="+benchmarks")
+    def request_benchmark_targets(self):
+        request_cmake_codemodel(self.build_directory)
+
+    @run_after("install", when="+benchmarks")
+    def install_collective_benchmarks(self):
+        # The benchmarks are only built, not installed; keep the executables of the targets
+        # defined in benchmarks/ for the standalone test
+        exes = cmake_executables(self.build_directory, "benchmarks")
+        if not exes:
+            raise InstallError("+benchmarks did not build any benchmark executables")
+        mkdirp(self.benchmark_dir)
+        for exe in exes:
+            install(exe, self.benchmark_dir)
+
+    def test_collectives(self):
+        """compare locality-aware and standard MPI collectives on one node"""
+        exes = self.executables_in(self.benchmark_dir)
+        if not exes:
+            raise SkipTest("Locality-aware was built without +benchmarks")
+
+        results = {}
+        for exe in exes:
+            result = self.run_benchmark(exe, ranks=self.collective_test_ranks)
+            # One row per message size, with a column per implementation
+            result["sizes"] = parse_table(result["output"])
+            results[os.path.basename(exe)] = result
+        self.write_benchmark_results("localityaware-collectives", results)
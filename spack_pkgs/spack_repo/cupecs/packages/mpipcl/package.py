@@ -3,12 +3,17 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import csv
+import os
+
 from spack_repo.builtin.build_systems.cmake import CMakePackage
+from spack_repo.cupecs.build_systems.compiler_cache import CompilerCachePackage
+from spack_repo.cupecs.build_systems.perf_test import PerfTestPackage
 
 from spack.package import *
 
 
-class Mpipcl(CMakePackage):
+class Mpipcl(CMakePackage, PerfTestPackage, CompilerCachePackage):
     """An open source shared library that implements the partitioned communication interface approved in MPI 4.0
 
         mpipcl is a part of the MPI-Advance Project developed and maintained by CUP-ECS.
@@ -35,10 +40,12 @@ class Mpipcl(CMakePackage):
     variant("debug", default=False, description="Turn on debug statments inside library")
     variant("examples", default=False, description="Build Example programs")
     variant("unique_names", default=False, description="Changes the names of functions to use MPIP instead of MPIX")
+    variant("benchmarks", default=False, description="Build a partitioned ping-pong and bandwidth benchmark")
 
     conflicts(
         "+examples", when="+unique_names", msg="No examples currently exist when using +unique_names"
     )
+    requires("build_type=Debug", when="+debug", msg="Debug statements need a Debug build")
     
     depends_on("c", type="build")
     depends_on("cxx", type="build")
@@ -49,8 +56,6 @@ class Mpipcl(CMakePackage):
         args = []
         if self.spec.satisfies("+static_libs"):
             args.append("-DDYNAMIC_LIBS=OFF")
-        if self.spec.satisfies("+debug"):
-            args.append("-DCMAKE_BUILD_TYPE=DEBUG")
         if self.spec.satisfies("+examples"):
             args.append("-DBUILD_EXAMPLES=ON")
             args.append("-DEXAMPLES_TO_BIN=ON")
@@ -58,3 +63,37 @@ class Mpipcl(CMakePackage):
             args.append("-DUNIQUE_NAMES=ON")
 
         return args
+
+    @run_after("install", when="+benchmarks")
+    def build_benchmarks(self):
+        # The benchmark only uses the installed library and headers, so build it the same
+        # way an application would.
+        libs = find_libraries(
+            "libmpipcl", self.prefix, shared=self.spec.satisfies("~static_libs"), recursive=True
+        )
+        headers = find_headers("mpipcl", self.prefix.include, recursive=True)
+
+        args = ["-O2", "-o", join_path(self.prefix.bin, "mpipcl_pingpong")]
+        if self.spec.satisfies("+unique_names"):
+            args.append("-DMPIPCL_UNIQUE_NAMES")
+        args.extend("-I" + directory for directory in headers.directories)
+        args.append(join_path(self.package_dir, "partitioned_pingpong.c"))
+        args.extend(libs)
+        if self.spec.satisfies("~static_libs"):
+            args.extend("-Wl,-rpath," + directory for directory in libs.directories)
+
+        mkdirp(self.prefix.bin)
+        Executable(self.spec["mpi"].mpicc)(*args)
+
+    def test_pingpong(self):
+        """compare partitioned and point-to-point ping-pong on two ranks"""
+        exe = join_path(self.prefix.bin, "mpipcl_pingpong")
+        if not os.path.exists(exe):
+            raise SkipTest("MPIPCL was built without +benchmarks")
+
+        result = self.run_benchmark(exe, ranks=2)
+        # Keep only the CSV the benchmark prints, not whatever the launcher adds
+        lines = result["output"].splitlines()
+        rows = [line for line in lines if line.split(",")[0] in ("mode", "p2p", "partitioned")]
+        result["sweep"] = list(csv.DictReader(rows))
+        self.write_benchmark_results("mpipcl-pingpong", {"pingpong": result})
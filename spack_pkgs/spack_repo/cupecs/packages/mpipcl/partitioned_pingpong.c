@@ -0,0 +1,158 @@
+/*
+ * Partitioned communication ping-pong and bandwidth sweep for MPIPCL.
+ *
+ * For every message size and partition count, rank 0 sends a message to rank 1
+ * in partitions and rank 1 sends it back the same way. The same exchange is
+ * also timed with plain MPI_Send/MPI_Recv for comparison. Rank 0 prints one
+ * CSV line per measurement:
+ *
+ *     mode,partitions,bytes,usec,MBps
+ *
+ * where usec is the one-way time per message and MBps the matching bandwidth.
+ * Build with -DMPIPCL_UNIQUE_NAMES when MPIPCL was configured with
+ * UNIQUE_NAMES=ON.
+ */
+#include <mpi.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+#include "mpipcl.h"
+
+#ifdef MPIPCL_UNIQUE_NAMES
+#define PCL(name) MPIP_##name
+#else
+#define PCL(name) MPIX_##name
+#endif
+
+#define MIN_BYTES 1024L
+#define MAX_BYTES (16L << 20)
+#define MAX_PARTITIONS 64
+#define WARMUP 5
+#define ITERATIONS 50
+
+/* Communicator of the two ranks taking part in the exchange */
+static MPI_Comm pair_comm;
+
+static void report(const char* mode, int partitions, long bytes, double seconds)
+{
+    double one_way = seconds / (2.0 * ITERATIONS);
+    printf("%s,%d,%ld,%.3f,%.3f\n", mode, partitions, bytes, one_way * 1e6,
+           bytes / one_way / 1e6);
+    fflush(stdout);
+}
+
+static double time_p2p(char* sendbuf, char* recvbuf, long bytes, int rank, int peer)
+{
+    double start = 0.0;
+    for (int i = 0; i < WARMUP + ITERATIONS; i++) {
+        if (i == WARMUP) {
+            MPI_Barrier(pair_comm);
+            start = MPI_Wtime();
+        }
+        if (rank == 0) {
+            MPI_Send(sendbuf, (int)bytes, MPI_BYTE, peer, 0, pair_comm);
+            MPI_Recv(recvbuf, (int)bytes, MPI_BYTE, peer, 1, pair_comm, MPI_STATUS_IGNORE);
+        } else {
+            MPI_Recv(recvbuf, (int)bytes, MPI_BYTE, peer, 0, pair_comm, MPI_STATUS_IGNORE);
+            MPI_Send(sendbuf, (int)bytes, MPI_BYTE, peer, 1, pair_comm);
+        }
+    }
+    return MPI_Wtime() - start;
+}
+
+static void send_partitions(PCL(Request) * request, int partitions)
+{
+    PCL(Start)(request);
+    for (int p = 0; p < partitions; p++) {
+        PCL(Pready)(p, request);
+    }
+    PCL(Wait)(request, MPI_STATUS_IGNORE);
+}
+
+static double time_partitioned(char* sendbuf, char* recvbuf, int partitions, long bytes,
+                               int rank, int peer)
+{
+    MPI_Count count = bytes / partitions;
+    PCL(Request) send, recv;
+
+    /* Initialize in matching order on both sides in case setup is synchronizing. */
+    if (rank == 0) {
+        PCL(Psend_init)(sendbuf, partitions, count, MPI_BYTE, peer, 0, pair_comm,
+                        MPI_INFO_NULL, &send);
+        PCL(Precv_init)(recvbuf, partitions, count, MPI_BYTE, peer, 1, pair_comm,
+                        MPI_INFO_NULL, &recv);
+    } else {
+        PCL(Precv_init)(recvbuf, partitions, count, MPI_BYTE, peer, 0, pair_comm,
+                        MPI_INFO_NULL, &recv);
+        PCL(Psend_init)(sendbuf, partitions, count, MPI_BYTE, peer, 1, pair_comm,
+                        MPI_INFO_NULL, &send);
+    }
+
+    double start = 0.0;
+    for (int i = 0; i < WARMUP + ITERATIONS; i++) {
+        if (i == WARMUP) {
+            MPI_Barrier(pair_comm);
+            start = MPI_Wtime();
+        }
+        PCL(Start)(&recv);
+        if (rank == 0) {
+            send_partitions(&send, partitions);
+            PCL(Wait)(&recv, MPI_STATUS_IGNORE);
+        } else {
+            PCL(Wait)(&recv, MPI_STATUS_IGNORE);
+            send_partitions(&send, partitions);
+        }
+    }
+    double elapsed = MPI_Wtime() - start;
+
+    PCL(Request_free)(&send);
+    PCL(Request_free)(&recv);
+    return elapsed;
+}
+
+int main(int argc, char** argv)
+{
+    int rank, size;
+    MPI_Init(&argc, &argv);
+    MPI_Comm_rank(MPI_COMM_WORLD, &rank);
+    MPI_Comm_size(MPI_COMM_WORLD, &size);
+
+    if (size < 2) {
+        fprintf(stderr, "%s: needs at least 2 ranks\n", argv[0]);
+        MPI_Abort(MPI_COMM_WORLD, 1);
+    }
+
+    char* sendbuf = (char*)malloc(MAX_BYTES);
+    char* recvbuf = (char*)malloc(MAX_BYTES);
+    memset(sendbuf, rank, MAX_BYTES);
+
+    /* Ranks beyond the first pair sit the benchmark out. */
+    int peer = rank == 0 ? 1 : 0;
+    int active = rank < 2;
+    MPI_Comm_split(MPI_COMM_WORLD, active, rank, &pair_comm);
+
+    if (rank == 0) {
+        printf("mode,partitions,bytes,usec,MBps\n");
+    }
+    if (active) {
+        for (long bytes = MIN_BYTES; bytes <= MAX_BYTES; bytes *= 4) {
+            double elapsed = time_p2p(sendbuf, recvbuf, bytes, rank, peer);
+            if (rank == 0) {
+                report("p2p", 1, bytes, elapsed);
+            }
+            for (int partitions = 1; partitions <= MAX_PARTITIONS; partitions *= 2) {
+                elapsed = time_partitioned(sendbuf, recvbuf, partitions, bytes, rank, peer);
+                if (rank == 0) {
+                    report("partitioned", partitions, bytes, elapsed);
+                }
+            }
+        }
+    }
+
+    MPI_Comm_free(&pair_comm);
+    free(sendbuf);
+    free(recvbuf);
+    MPI_Finalize();
+    return 0;
+}
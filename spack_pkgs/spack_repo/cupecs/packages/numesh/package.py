@@ -5,10 +5,14 @@
 from spack_repo.builtin.build_systems.cmake import CMakePackage
 from spack_repo.builtin.build_systems.cuda import CudaPackage
 from spack_repo.builtin.build_systems.rocm import ROCmPackage
+from spack_repo.cupecs.build_systems.caliper import CaliperPackage
+from spack_repo.cupecs.build_systems.compiler_cache import CompilerCachePackage
+from spack_repo.cupecs.build_systems.gpu_mpi import GpuAwareMpiPackage
+from spack_repo.cupecs.build_systems.kokkos import KokkosAppPackage
 
 from spack.package import *
 
-class Numesh(CMakePackage, CudaPackage, ROCmPackage):
+class Numesh(CMakePackage, CudaPackage, ROCmPackage, GpuAwareMpiPackage, KokkosAppPackage, CaliperPackage, CompilerCachePackage):
     """Locality-aware optimizations for standard MPI collectives as well as neighborhood collectives."""
 
     homepage = "https://github.com/JStewart28/numesh"
@@ -18,9 +22,12 @@ class Numesh(CMakePackage, CudaPackage, ROCmPackage):
 
     license("BSD-3-Clause")
 
+    # These still clone recursively, so they cannot be served from a source mirror. Replace
+    # them with version("<date>", commit="<sha>") pins, and replace each submodule with a
+    # depends_on() (or a resource() pinned to the submodule commit) that cmake_args points at.
     version("develop", branch="develop", submodules=True)
     version("master", branch="master", submodules=True)
-    
+
     depends_on("c", type="build")
     depends_on("cxx", type="build")
     
@@ -63,26 +70,10 @@ class Numesh(CMakePackage, CudaPackage, ROCmPackage):
     # conflicts("^spectrum-mpi", when="^cuda@11.3:") # cuda-aware spectrum is broken with cuda 11.3:
 
 
+    caliper_option = "Numesh_ENABLE_CALIPER"
+
     # CMake specific build functions
     def cmake_args(self):
-        args = []
-
-        # Use hipcc as the c compiler if we are compiling for rocm. Doing it this way
-        # keeps the wrapper insted of changeing CMAKE_CXX_COMPILER keeps the spack wrapper
-        # and the rpaths it sets for us from the underlying spec.
-        if self.spec.satisfies("+rocm"):
-            env["SPACK_CXX"] = self.spec["hip"].hipcc
-
-        # If we're building with cray mpich, we need to make sure we get the GTL library for
-        # gpu-aware MPI
-        if self.spec.satisfies("+rocm ^cray-mpich"):
-            gtl_dir = join_path(self.spec["cray-mpich"].prefix, "..", "..", "..", "gtl", "lib")
-            args.append(
-                "-DCMAKE_EXE_LINKER_FLAGS=-Wl,-rpath={0} -L{0} -lmpi_gtl_hsa".format(gtl_dir)
-            )
-        elif self.spec.satisfies("+cuda ^cray-mpich"):
-            gtl_dir = join_path(self.spec["cray-mpich"].prefix, "..", "..", "..", "gtl", "lib")
-            args.append(
-                "-DCMAKE_EXE_LINKER_FLAGS=-Wl,-rpath={0} -L{0} -lmpi_gtl_cuda".format(gtl_dir)
-            )
+        args = self.caliper_args()
+        args.extend(self.gpu_aware_mpi_args())
         return args
@@ -0,0 +1,48 @@
+# Copyright Spack Project Developers. See COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Fixtures for the recipe tests. They need spack's python, so run them with:
+
+    spack python -m pytest tests
+"""
+
+import os
+
+import pytest
+
+try:
+    import spack.config
+    import spack.repo
+    import spack.spec
+except ImportError:
+    # Not running under spack python; nothing here can be collected.
+    collect_ignore_glob = ["test_*.py"]
+
+REPO_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "spack_pkgs", "spack_repo", "cupecs"
+)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def cupecs_repo():
+    """Put the packages of this checkout ahead of the configured repositories."""
+    with spack.repo.use_repositories(REPO_PATH, override=False) as path:
+        yield path
+
+
+@pytest.fixture(scope="session")
+def concretize():
+    """Concretize an abstract spec without reusing installed specs."""
+
+    def _concretize(abstract):
+        spec = spack.spec.Spec(abstract)
+        with spack.config.override("concretizer:reuse", False):
+            try:
+                import spack.concretize
+
+                return spack.concretize.concretize_one(spec)
+            except (ImportError, AttributeError):
+                return spec.concretized()
+
+    return _concretize
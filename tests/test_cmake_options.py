@@ -0,0 +1,59 @@
+# Copyright Spack Project Developers. See COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import importlib
+import json
+
+import pytest
+
+import spack.repo
+
+
+@pytest.fixture()
+def cmake_options(cupecs_repo):
+    spack.repo.PATH.get_pkg_class("localityaware")
+    return importlib.import_module("spack_repo.cupecs.build_systems.cmake_options")
+
+
+def test_has_cmake_option(cmake_options, tmp_path):
+    (tmp_path / "CMakeLists.txt").write_text('project(foo)\nadd_subdirectory(benchmarks)\n')
+    (tmp_path / "benchmarks").mkdir()
+    (tmp_path / "benchmarks" / "CMakeLists.txt").write_text(
+        'option(ENABLE_BENCHMARKS "x" ON)\noption(ENABLE_BENCHMARKS_GPU "y" OFF)\n'
+    )
+    assert cmake_options.has_cmake_option(str(tmp_path), "ENABLE_BENCHMARKS")
+    assert cmake_options.has_cmake_option(str(tmp_path), "ENABLE_BENCHMARKS_GPU")
+    assert not cmake_options.has_cmake_option(str(tmp_path), "BENCHMARKS")
+    assert not cmake_options.has_cmake_option(str(tmp_path), "ENABLE_CALIPER")
+
+
+def write_reply(build_dir, targets):
+    reply = build_dir / ".cmake" / "api" / "v1" / "reply"
+    reply.mkdir(parents=True)
+    refs = []
+    for i, (kind, source, artifact) in enumerate(targets):
+        target = {"type": kind, "paths": {"source": source}, "artifacts": [{"path": artifact}]}
+        (reply / "target-{0}.json".format(i)).write_text(json.dumps(target))
+        refs.append({"jsonFile": "target-{0}.json".format(i)})
+    model = {"configurations": [{"targets": refs}]}
+    (reply / "codemodel-v2-1.json").write_text(json.dumps(model))
+    index = {"objects": [{"kind": "codemodel", "jsonFile": "codemodel-v2-1.json"}]}
+    (reply / "index-2025-01-01T00-00-00-0000.json").write_text(json.dumps(index))
+
+
+def test_cmake_executables(cmake_options, tmp_path):
+    write_reply(
+        tmp_path,
+        [
+            ("EXECUTABLE", "benchmarks", "benchmarks/allreduce"),
+            ("EXECUTABLE", "benchmarks/gpu", "benchmarks/gpu/alltoall"),
+            ("SHARED_LIBRARY", "benchmarks", "benchmarks/libbench.so"),
+            ("EXECUTABLE", "benchmarks_old", "benchmarks_old/old"),
+            ("EXECUTABLE", "tests", "tests/test_alltoall"),
+        ],
+    )
+    assert cmake_options.cmake_executables(str(tmp_path), "benchmarks") == [
+        str(tmp_path / "benchmarks" / "allreduce"),
+        str(tmp_path / "benchmarks" / "gpu" / "alltoall"),
+    ]
@@ -0,0 +1,38 @@
+# Copyright Spack Project Developers. See COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import pytest
+
+
+@pytest.mark.parametrize("app", ["cabanaghost", "cabanafluids"])
+@pytest.mark.parametrize(
+    "device", ["+cuda cuda_arch=80", "+cuda cuda_arch=90", "+rocm amdgpu_target=gfx90a"]
+)
+def test_app_device_reaches_kokkos(app, device, concretize):
+    spec = concretize("{0} {1}".format(app, device))
+    assert spec["cabana"].satisfies(device)
+    assert spec["kokkos"].satisfies(device)
+
+
+@pytest.mark.parametrize("app", ["cabanaghost", "cabanafluids"])
+def test_app_host_build_has_host_kokkos(app, concretize):
+    spec = concretize("{0} ~cuda ~rocm".format(app))
+    assert spec["kokkos"].satisfies("~cuda ~rocm")
+
+
+@pytest.mark.parametrize("tpl", ["arborx", "heffte"])
+def test_cabana_submodule_arch(tpl, concretize):
+    spec = concretize("cabana@0.7.0 +cuda cuda_arch=80 +{0}".format(tpl))
+    assert spec[tpl].satisfies("+cuda cuda_arch=80")
+
+
+def test_cabana_hypre_cmake_has_no_second_hypre(concretize):
+    spec = concretize("cabana@0.7.0 +cuda cuda_arch=80 +hypre")
+    assert "hypre_cmake" in spec
+    assert "hypre" not in spec
+
+
+def test_cabanaghost_localityaware_arch(concretize):
+    spec = concretize("cabanaghost +localityaware +cuda cuda_arch=80")
+    assert spec["localityaware"].satisfies("+cuda cuda_arch=80")
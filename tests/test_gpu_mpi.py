@@ -0,0 +1,102 @@
+# Copyright Spack Project Developers. See COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import importlib
+import os
+
+import pytest
+
+import spack.config
+import spack.error
+import spack.repo
+from spack.util.environment import EnvironmentModifications
+
+
+@pytest.fixture()
+def gpu_mpi(cupecs_repo):
+    # Loading a package that uses the mixin makes spack_repo.cupecs importable
+    spack.repo.PATH.get_pkg_class("cabanaghost")
+    module = importlib.import_module("spack_repo.cupecs.build_systems.gpu_mpi")
+    module.find_cray_gtl.cache_clear()
+    yield module
+    module.find_cray_gtl.cache_clear()
+
+
+def make_cray_mpich(gpu_mpi, root, backends=("cuda",)):
+    """Lay out a fake Cray MPICH install and return its prefix."""
+    prefix = root / "mpich" / "ofi" / "gnu" / "12.3"
+    prefix.mkdir(parents=True)
+    gtl = root / "mpich" / "gtl" / "lib"
+    gtl.mkdir(parents=True)
+    for backend in backends:
+        (gtl / (gpu_mpi.GTL_LIBRARIES[backend] + ".so")).touch()
+    return prefix
+
+
+def test_find_cray_gtl(gpu_mpi, tmp_path):
+    prefix = make_cray_mpich(gpu_mpi, tmp_path)
+    expected = os.path.realpath(tmp_path / "mpich" / "gtl" / "lib")
+    assert gpu_mpi.find_cray_gtl(str(prefix), "cuda") == expected
+
+
+def test_find_cray_gtl_in_rootdir(gpu_mpi, tmp_path):
+    make_cray_mpich(gpu_mpi, tmp_path, backends=("rocm",))
+    # A prefix outside the usual <rootdir>/ofi/<compiler>/<version> layout
+    prefix = tmp_path / "cray-mpich"
+    prefix.mkdir()
+    rootdir = str(tmp_path / "mpich")
+    gtl_dir = gpu_mpi.find_cray_gtl(str(prefix), "rocm", mpich_rootdir=rootdir)
+    assert gtl_dir == os.path.realpath(os.path.join(rootdir, "gtl", "lib"))
+
+
+def test_find_cray_gtl_missing(gpu_mpi, tmp_path):
+    prefix = make_cray_mpich(gpu_mpi, tmp_path, backends=("cuda",))
+    with pytest.raises(spack.error.InstallError, match="libmpi_gtl_hsa"):
+        gpu_mpi.find_cray_gtl(str(prefix), "rocm")
+
+
+def test_find_cray_gtl_is_cached(gpu_mpi, tmp_path):
+    prefix = make_cray_mpich(gpu_mpi, tmp_path)
+    gpu_mpi.find_cray_gtl(str(prefix), "cuda")
+    gpu_mpi.find_cray_gtl(str(prefix), "cuda")
+    assert gpu_mpi.find_cray_gtl.cache_info().hits == 1
+
+
+def run_environment(spec):
+    env = EnvironmentModifications()
+    spec.package.setup_run_environment(env)
+    return {mod.name: getattr(mod, "value", None) for mod in env.env_modifications}
+
+
+@pytest.fixture()
+def external_cray_mpich(gpu_mpi, tmp_path):
+    prefix = make_cray_mpich(gpu_mpi, tmp_path)
+    packages = {
+        "buildable": False,
+        "externals": [{"spec": "cray-mpich@8.1.28", "prefix": str(prefix)}],
+    }
+    with spack.config.override("packages:cray-mpich", packages):
+        yield prefix
+
+
+def test_run_environment_cuda_cray_mpich(gpu_mpi, external_cray_mpich, concretize):
+    env = run_environment(concretize("cabanaghost +cuda cuda_arch=80 ^cray-mpich"))
+    assert env["MPICH_GPU_SUPPORT_ENABLED"] == "1"
+    assert env["KOKKOS_MAP_DEVICE_ID_BY"] == "mpi_rank"
+    assert "OMPI_MCA_opal_cuda_support" not in env
+
+
+def test_run_environment_cuda_openmpi(gpu_mpi, concretize):
+    env = run_environment(concretize("cabanaghost +cuda cuda_arch=80 ^openmpi"))
+    assert env["OMPI_MCA_opal_cuda_support"] == "true"
+    assert env["KOKKOS_MAP_DEVICE_ID_BY"] == "mpi_rank"
+    assert "MPICH_GPU_SUPPORT_ENABLED" not in env
+
+
+def test_run_environment_host_openmp(gpu_mpi, concretize):
+    env = run_environment(concretize("cabanaghost ~cuda ~rocm ^kokkos+openmp"))
+    assert env["OMP_PROC_BIND"] == "spread"
+    assert env["OMP_PLACES"] == "threads"
+    assert "KOKKOS_MAP_DEVICE_ID_BY" not in env
+    assert "MPICH_GPU_SUPPORT_ENABLED" not in env
@@ -0,0 +1,20 @@
+# Copyright Spack Project Developers. See COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import pytest
+
+
+@pytest.mark.parametrize("device", ["+cuda cuda_arch=80", "+rocm amdgpu_target=gfx90a"])
+def test_cabanafluids_device_hypre(device, concretize):
+    spec = concretize("cabanafluids +hypre {0}".format(device))
+    assert spec["cabana"].satisfies("@0.8.0:")
+    assert spec["hypre"].satisfies("{0} +unified-memory +gpu-aware-mpi".format(device))
+    assert "hypre_cmake" not in spec
+
+
+def test_cabanafluids_host_hypre(concretize):
+    spec = concretize("cabanafluids +hypre ~cuda ~rocm")
+    assert spec["cabana"].satisfies("@0.7.0")
+    assert "hypre_cmake" in spec
+    assert "hypre" not in spec
@@ -0,0 +1,39 @@
+# Copyright Spack Project Developers. See COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import importlib
+
+import pytest
+
+import spack.repo
+
+
+@pytest.fixture()
+def perf_test(cupecs_repo):
+    spack.repo.PATH.get_pkg_class("localityaware")
+    return importlib.import_module("spack_repo.cupecs.build_systems.perf_test")
+
+
+def test_parse_timings(perf_test):
+    output = "Setup: 0.5 s\nSolve time = 1.25e+00 s\nIterations: 12\nDone\n"
+    timings = perf_test.parse_timings(output)
+    assert timings == {"Setup": [0.5], "Solve time": [1.25], "Iterations": [12.0]}
+
+
+def test_parse_table(perf_test):
+    output = "\n".join(
+        [
+            "Testing MPI_Alltoall on 4 ranks",
+            "bytes standard locality",
+            "8 1.5e-06 1.0e-06",
+            "1024, 2.5e-05, 1.5e-05",
+            "Done.",
+            "16 32",
+        ]
+    )
+    assert perf_test.parse_table(output) == [
+        {"bytes": 8.0, "standard": 1.5e-06, "locality": 1.0e-06},
+        {"bytes": 1024.0, "standard": 2.5e-05, "locality": 1.5e-05},
+        {"column0": 16.0, "column1": 32.0},
+    ]